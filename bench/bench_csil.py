@@ -0,0 +1,336 @@
+"""
+Benchmarks for csil's own overhead.
+
+Synthetic BLIF modules are laid out in an orlo style directory tree and
+then splat, get_pareto, impl_select, plt_csv, report_checks,
+sweep_period and scan_history are run against the stand-in ABC, pyosys
+and sta found in bench/fakes.  The tool latencies are controllable, so
+with them set to zero what is measured is (mostly) csil itself.
+Results are written as JSON so that runs on different commits can be
+compared with --compare.
+
+    python bench/bench_csil.py --modules 20 --depth 3 -o before.json
+    python bench/bench_csil.py --modules 20 --depth 3 --compare before.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKES_DIR = os.path.join(BENCH_DIR, "fakes")
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+
+# The fakes have to be visible before csil is imported (and to any sub
+# processes csil starts), so this is done at the very start.
+def use_fakes(args):
+    os.environ["CSIL_FAKE_ABC_LATENCY"] = str(args.abc_latency)
+    os.environ["CSIL_FAKE_YOSYS_LATENCY"] = str(args.yosys_latency)
+    os.environ["CSIL_FAKE_YOSYS_GATES"] = str(args.gates)
+    os.environ["CSIL_FAKE_STA_LATENCY"] = str(args.sta_latency)
+    os.environ["PATH"] = FAKES_DIR + os.pathsep + os.environ.get("PATH", "")
+    pypath = [FAKES_DIR, REPO_DIR, os.environ.get("PYTHONPATH", "")]
+    os.environ["PYTHONPATH"] = os.pathsep.join(p for p in pypath if p)
+    sys.path[:0] = [FAKES_DIR, REPO_DIR]
+
+
+# A flat blif named "model", like the ones orlo writes for ABC
+def make_blif(fname, ngates, rng):
+    ninputs = max(2, ngates // 8)
+    inputs = [f"i{k}" for k in range(ninputs)]
+    with open(fname, "w") as fd:
+        fd.write(".model model\n")
+        fd.write(".inputs " + " ".join(inputs) + "\n")
+        fd.write(f".outputs n{ngates - 1}\n")
+        nets = list(inputs)
+        for k in range(ngates):
+            a, b = rng.sample(nets, 2)
+            fd.write(f".names {a} {b} n{k}\n11 1\n")
+            nets.append(f"n{k}")
+        fd.write(".end\n")
+
+
+# Build <workdir>/yosys-abc-XXXXXX/<module>_<n>/{input,output}.blif with a
+# module hierarchy of the given depth.  The number of modules at each level
+# grows by fanout until nmodules is reached and modules get smaller as we go
+# down.  Each module gets ndomains clock domain directories. Returns the
+# name of the randomly named abc_topdir, relative to workdir.
+def make_tree(workdir, nmodules, depth, gates, ndomains=1, seed=0):
+    rng = random.Random(seed)
+    topname = "yosys-abc-" + "".join(rng.choice("abcdefghABCDEFGH") for _ in range(6))
+    topdir = os.path.join(workdir, topname)
+    os.makedirs(topdir)
+    fanout = max(1, round(nmodules ** (1.0 / max(depth, 1))))
+    made = 0
+    level = 0
+    width = 1
+    while made < nmodules:
+        lvl = min(level, depth - 1)
+        ngates = max(4, gates // (2 ** lvl))
+        for k in range(min(width, nmodules - made)):
+            for n in range(ndomains):
+                mdir = os.path.join(topdir, f"mod_l{lvl}_{made}_{n}")
+                os.makedirs(mdir)
+                make_blif(os.path.join(mdir, "input.blif"), ngates, rng)
+                shutil.copy(os.path.join(mdir, "input.blif"),
+                            os.path.join(mdir, "output.blif"))
+            made += 1
+        level += 1
+        width *= fanout
+    return topname
+
+
+def percentile(vals, q):
+    vals = sorted(vals)
+    if len(vals) == 1:
+        return vals[0]
+    pos = (len(vals) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(vals) - 1)
+    return vals[lo] + (vals[hi] - vals[lo]) * (pos - lo)
+
+
+def summarize(latencies, items):
+    total = sum(latencies)
+    return {
+        "items": items,
+        "repeats": len(latencies),
+        "latency_s": {
+            "min": min(latencies),
+            "mean": total / len(latencies),
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+        },
+        "throughput_per_s": items * len(latencies) / total if total > 0 else None,
+    }
+
+
+def child_rss_kb():
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+# Run fn (quietly) repeat times, then once more under tracemalloc for the
+# peak Python heap. Tracing is kept out of the timed runs, and only sees
+# this process. Work done in sub processes (the plt_csv pool, sta) shows
+# up in the max RSS of the children, which is a running maximum over
+# every child so far, so it is only attributed to this benchmark if fn
+# raised it.
+def measure(fn, items, repeat, memory=True):
+    latencies = []
+    before = child_rss_kb()
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        res = summarize(latencies, items)
+        if memory:
+            tracemalloc.start()
+            fn()
+            res["peak_python_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    after = child_rss_kb()
+    res["child_max_rss_kb"] = after if after > before else None
+    return res
+
+
+# Cold import time of csil (and its dependencies) in a fresh interpreter
+def import_time(repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import csil"], check=True)
+        times.append(time.perf_counter() - start)
+    base = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        base.append(time.perf_counter() - start)
+    return {"p50_s": percentile(times, 50),
+            "interpreter_p50_s": percentile(base, 50),
+            "csil_p50_s": percentile(times, 50) - percentile(base, 50)}
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "-C", REPO_DIR, "rev-parse", "HEAD"],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    use_fakes(args)
+    import numpy as np
+    import pandas as pd
+    import csil
+    from csil import splat, impl_select, plt_csv, ImplMode, CDesign, scan_history
+    from csil.utils import get_pareto
+
+    out = {
+        "meta": {
+            "commit": git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "csil_version": csil.__version__,
+            "params": vars(args).copy(),
+        },
+        "import_time": import_time(args.import_repeat),
+        "benchmarks": {},
+    }
+    out["meta"]["params"].pop("output")
+    out["meta"]["params"].pop("compare")
+    bench = out["benchmarks"]
+
+    olddir = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="csil-bench-")
+    try:
+        os.chdir(workdir)
+        topdir = make_tree(workdir, args.modules, args.depth, args.gates,
+                           args.domains, args.seed)
+        nmods = len(os.listdir(topdir))
+
+        bench["splat"] = measure(lambda: splat(topdir), nmods, args.repeat,
+                                 args.memory)
+
+        # One csv with every module, as plt_csv sees it for a whole design
+        frames = []
+        for mdir in sorted(os.listdir(topdir)):
+            df = pd.read_csv(os.path.join(topdir, mdir, "results.csv"))
+            df["design"] = mdir
+            frames.append(df)
+        all_df = pd.concat(frames)
+        all_df.to_csv("all_results.csv")
+        npoints = len(all_df.index)
+
+        for mode in ImplMode:
+            bench[f"impl_select_{mode.name.lower()}"] = measure(
+                lambda: impl_select(topdir, mode), nmods, args.repeat, args.memory)
+
+        rng = np.random.default_rng(args.seed)
+        pts = rng.random((args.points, 2))
+        bench["get_pareto"] = measure(lambda: get_pareto(pts, [0, 1], []),
+                                      args.points, args.repeat, args.memory)
+        V = all_df[["area", "delay"]].to_numpy()
+        bench["get_pareto_results"] = measure(lambda: get_pareto(V, [0, 1], []),
+                                              npoints, args.repeat, args.memory)
+
+        bench["scan_history"] = measure(
+            lambda: scan_history(f"{topdir}/*/results.csv", args.chunksize, key="dir"),
+            npoints, args.repeat, args.memory)
+
+        pdir = os.path.join(workdir, "plots")
+        os.makedirs(pdir)
+        os.chdir(pdir)
+        bench["plt_csv"] = measure(lambda: plt_csv("../all_results.csv"), nmods,
+                                   args.plot_repeat, args.memory)
+        os.chdir(workdir)
+
+        cd = CDesign()
+        cd.liberty = "fake.lib"
+        bench["report_checks"] = measure(cd.report_checks, 1, args.repeat,
+                                         args.memory)
+        periods = list(np.linspace(0.5, 5.0, args.periods))
+        bench["sweep_period"] = measure(lambda: cd.sweep_period(periods),
+                                        args.periods, args.repeat, args.memory)
+    finally:
+        os.chdir(olddir)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            out["meta"]["workdir"] = workdir
+
+    out["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out["child_max_rss_kb"] = child_rss_kb()
+    out["memory_notes"] = {
+        "peak_python_bytes": "tracemalloc peak of this process only, not of "
+                             "worker or tool processes",
+        "child_max_rss_kb": "largest max RSS of any finished child process "
+                            "(pool workers, fake sta); per benchmark it is null "
+                            "unless that benchmark raised the running maximum",
+        "max_rss_kb": "max RSS of this process",
+    }
+    return out
+
+
+# Ratio of new to old median latency for every benchmark in both runs
+def compare(old, new):
+    rows = {}
+    for name, res in new["benchmarks"].items():
+        if name in old.get("benchmarks", {}):
+            o = old["benchmarks"][name]["latency_s"]["p50"]
+            n = res["latency_s"]["p50"]
+            rows[name] = {"old_p50_s": o, "new_p50_s": n,
+                          "ratio": n / o if o > 0 else None}
+    return {"old_commit": old.get("meta", {}).get("commit"),
+            "new_commit": new["meta"]["commit"], "p50": rows}
+
+
+def positive_int(text):
+    val = int(text)
+    if val < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {val}")
+    return val
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--modules", type=positive_int, default=10, help="number of modules")
+    ap.add_argument("--depth", type=positive_int, default=3, help="hierarchy depth")
+    ap.add_argument("--domains", type=int, default=1,
+                    help="clock domains (directories) per module")
+    ap.add_argument("--gates", type=int, default=200,
+                    help="gates in a top level module")
+    ap.add_argument("--points", type=int, default=2000,
+                    help="random points for get_pareto")
+    ap.add_argument("--periods", type=int, default=20,
+                    help="clock periods for sweep_period")
+    ap.add_argument("--chunksize", type=int, default=100000,
+                    help="rows per chunk for scan_history")
+    ap.add_argument("--abc-latency", type=float, default=0.0,
+                    help="seconds per fake ABC command")
+    ap.add_argument("--yosys-latency", type=float, default=0.0,
+                    help="seconds per fake Yosys pass")
+    ap.add_argument("--sta-latency", type=float, default=0.0,
+                    help="seconds of fake sta startup")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--plot-repeat", type=int, default=1)
+    ap.add_argument("--import-repeat", type=int, default=5)
+    ap.add_argument("--no-memory", dest="memory", action="store_false",
+                    help="skip the tracemalloc pass")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--keep", action="store_true", help="keep the work directory")
+    ap.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    ap.add_argument("--compare", help="JSON from an earlier run to compare against")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out = run(args)
+    if args.compare:
+        with open(args.compare) as fd:
+            out["compare"] = compare(json.load(fd), out)
+    text = json.dumps(out, indent=2)
+    if args.output:
+        with open(args.output, "w") as fd:
+            fd.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Stand-in for the SWIG wrapped ABC module, used only by the benchmarks.
+
+It keeps a tiny model of the current network (gates, area, delay) that
+every command perturbs deterministically, so that repeated runs give the
+same point clouds.  Per command latency is set (in seconds) with the
+environment variable CSIL_FAKE_ABC_LATENCY.
+"""
+import os
+import random
+import time
+import zlib
+
+
+def _latency():
+    return float(os.environ.get("CSIL_FAKE_ABC_LATENCY", "0"))
+
+
+# Read back a blif, either a synthetic one or one we wrote ourselves (in
+# which case the header comment carries the exact state)
+def _read_blif(fname):
+    state = None
+    gates = 0
+    with open(fname) as fd:
+        for line in fd:
+            if line.startswith("# csil-fake"):
+                kv = dict(tok.split("=") for tok in line.split()[2:])
+                state = {"gates": int(kv["gates"]), "area": float(kv["area"]),
+                         "delay": float(kv["delay"]), "seed": int(kv["seed"])}
+            elif line.startswith(".names") or line.startswith(".gate"):
+                gates += 1
+    if state is None:
+        gates = max(gates, 1)
+        state = {"gates": gates, "area": 4.0 * gates,
+                 "delay": 50.0 * (1 + gates).bit_length(),
+                 "seed": zlib.crc32(fname.encode())}
+    return state
+
+
+def _write_blif(fname, state):
+    with open(fname, "w") as fd:
+        fd.write(f"# csil-fake gates={state['gates']} area={state['area']!r} "
+                 f"delay={state['delay']!r} seed={state['seed']}\n")
+        fd.write(".model model\n.inputs a b\n.outputs y\n")
+        for i in range(state["gates"]):
+            fd.write(f".names a b n{i}\n11 1\n")
+        fd.write(".end\n")
+
+
+def _stime(state):
+    return (f"WireLoad = \"none\"  Gates = {state['gates']} ( 10.0 %)   "
+            f"Cap =  2.0 ff (  5.0 %)   Area = {state['area']:.2f} ( 90.0 %)   "
+            f"Delay = {state['delay']:.2f} ps  ( 12.0 %)\n")
+
+
+# Any other command nudges the design a little. Area and delay pull against
+# each other so that the point cloud has an actual Pareto front.
+def _optimize(state, cmd):
+    seed = zlib.crc32(f"{state['seed']}:{cmd}".encode())
+    rng = random.Random(seed)
+    f = rng.uniform(0.90, 1.04)
+    state["gates"] = max(1, int(state["gates"] * f))
+    state["area"] *= f * rng.uniform(0.98, 1.02)
+    state["delay"] *= (2.0 - f) * rng.uniform(0.95, 1.03)
+    state["seed"] = seed
+
+
+def abc_start():
+    state = {"gates": 0, "area": 0.0, "delay": 0.0, "seed": 0}
+
+    def cmd(script):
+        out = ""
+        for c in filter(None, (s.strip() for s in script.split(";"))):
+            time.sleep(_latency())
+            toks = c.split()
+            if toks[0] == "read_blif":
+                if not os.path.exists(toks[-1]):
+                    return (1, f"Cannot open input file \"{toks[-1]}\".\n")
+                state.update(_read_blif(toks[-1]))
+            elif toks[0] == "write_blif":
+                _write_blif(toks[-1], state)
+            elif toks[0] == "stime":
+                out += _stime(state)
+            elif toks[0] in ("read_lib", "read_constr"):
+                pass
+            else:
+                _optimize(state, c)
+        return (0, out)
+
+    return cmd
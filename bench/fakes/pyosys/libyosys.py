@@ -0,0 +1,65 @@
+"""
+Stand-in for pyosys.libyosys, used only by the benchmarks.
+
+Just enough of the Design/Module/IdString api for CDesign to run. Passes
+that write files produce a small gate level netlist whose size is set
+with CSIL_FAKE_YOSYS_GATES, and every pass sleeps CSIL_FAKE_YOSYS_LATENCY
+seconds.
+"""
+import os
+import time
+
+
+class IdString:
+    def __init__(self, name):
+        self.name = name
+
+    def str(self):
+        return self.name
+
+    def __eq__(self, other):
+        return isinstance(other, IdString) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+class Wire:
+    def __init__(self, name, port_id):
+        self.name = IdString(name)
+        self.port_id = port_id
+
+
+class Module:
+    def __init__(self, name="\\top"):
+        self.name = IdString(name)
+        self.wires_ = {IdString("\\clk"): Wire("\\clk", 1),
+                       IdString("\\a"): Wire("\\a", 2),
+                       IdString("\\y"): Wire("\\y", 3)}
+
+    def wire(self, id_name):
+        return self.wires_[id_name]
+
+
+class Design:
+    def __init__(self):
+        self.module = Module()
+
+    def top_module(self):
+        return self.module
+
+
+def _write_netlist(fname):
+    gates = int(os.environ.get("CSIL_FAKE_YOSYS_GATES", "100"))
+    with open(fname, "w") as fd:
+        fd.write("module top(clk, a, y);\n  input clk, a;\n  output y;\n")
+        for i in range(gates):
+            fd.write(f"  sky130_fd_sc_hs__nand2_1 g{i} (.A(a), .B(a), .Y(n{i}));\n")
+        fd.write("endmodule\n")
+
+
+def run_pass(cmd, design):
+    time.sleep(float(os.environ.get("CSIL_FAKE_YOSYS_LATENCY", "0")))
+    toks = cmd.split()
+    if toks and toks[0].startswith("write_") and len(toks) > 1:
+        _write_netlist(toks[-1])
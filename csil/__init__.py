@@ -30,3 +30,5 @@ __version__ = "0.0.1"
 from .cdesign import CDesign
 from .utils import plt_csv, impl_select, ImplMode
 from .splat import splat_one, splat, dump_script
+from .evolve import evolve_one, evolve
+from .history import scan_history
@@ -1,12 +1,15 @@
 from collections import defaultdict
 import copy
 import glob
+import itertools
 import os
 import random
 import string
 import subprocess
 import sys
 import abc
+import numpy as np
+import pandas as pd
 from pyosys import libyosys as ys
 
 
@@ -238,18 +241,28 @@ class CDesign(YDesign):
         return r
 
     # Make an sdc file suitable for OpenSTA given a fully mapped gate level verilog file
-    def make_sdc(self, vfile):
+    # By default it uses the design's period and io delays, but constraints can be a
+    # list of (period, input_delay, output_delay) which are then all timed, one after
+    # the other, in the same OpenSTA run. Each report is preceded by a line
+    # "csil_sweep <index>" so the output can be split back up.
+    def make_sdc(self, vfile, constraints=None):
         topname = self.ydesign.top_module().name.str()[1:]
         sdc_file = topname + "_" + randtag(5) + ".sdc"
         nflag = "-name" if self.is_port(self.clock) else ""
-        with open(sfile, "w") as fd:
+        sweep = constraints is not None
+        if not sweep:
+            constraints = [(self.period, self.input_delay, self.output_delay)]
+        with open(sdc_file, "w") as fd:
             fd.write(f"read_liberty {self.liberty}\n")
             fd.write(f"read_verilog {vfile}\n")
             fd.write(f"link {topname}\n")
-            fd.write(f"create_clock {nflag} {self.clock} -period {self.period}\n")
-            fd.write(f"set_input_delay -clock [get_clocks {self.clock}] {self.input_delay} [all_inputs]\n")
-            fd.write(f"set_output_delay -clock [get_clocks {self.clock}] {self.output_delay} [all_outputs]\n")
-            fd.write(f"report_checks")
+            for k, (period, input_delay, output_delay) in enumerate(constraints):
+                if sweep:
+                    fd.write(f"puts \"csil_sweep {k}\"\n")
+                fd.write(f"create_clock {nflag} {self.clock} -period {period}\n")
+                fd.write(f"set_input_delay -clock [get_clocks {self.clock}] {input_delay} [all_inputs]\n")
+                fd.write(f"set_output_delay -clock [get_clocks {self.clock}] {output_delay} [all_outputs]\n")
+                fd.write(f"report_checks\n")
         return sdc_file
 
     # Possibly the ports have been bit blasted, so check for name "a[1]" etc, if needed
@@ -304,6 +317,59 @@ class CDesign(YDesign):
         # Note this does not return self so you cannot "pipe" report_checks
         return (delay, slack)
 
+    # Time the design over every combination of the given clock periods and io
+    # delays (which default to the design's own) and return a DataFrame with the
+    # worst arrival and slack for each.  The netlist is written once and all the
+    # constraint sets are timed in one OpenSTA session.  If checkpoints is True
+    # all the checkpoints are swept as well, or it can be a list of their names.
+    def sweep_period(self, periods, input_delays=None, output_delays=None,
+                     checkpoints=False, cleanup=True):
+        if input_delays is None:
+            input_delays = [self.input_delay]
+        if output_delays is None:
+            output_delays = [self.output_delay]
+        constraints = list(itertools.product(periods, input_delays, output_delays))
+
+        designs = [("current", self)]
+        if checkpoints is True:
+            checkpoints = list(self.checkpoints)
+        for name in checkpoints or []:
+            designs.append((name, self.checkpoints[name]))
+
+        frames = []
+        for name, des in designs:
+            vfile = randtag(15) + ".v"
+            des.write_verilog(f"-simple-lhs {vfile}")
+            sdc_file = des.make_sdc(vfile, constraints)
+
+            print(f"sweeping {len(constraints)} constraint sets on {name} with OpenSTA")
+            results = subprocess.run(["sta", "-no_init", "-no_splash", "-exit", sdc_file],
+                                     stdout=subprocess.PIPE, universal_newlines=True)
+            arrival = np.full(len(constraints), np.nan)
+            slack = np.full(len(constraints), np.nan)
+            k = None
+            for line in results.stdout.split("\n"):
+                if line.startswith("csil_sweep"):
+                    k = int(line.split()[1])
+                elif k is None:
+                    continue
+                elif "data arrival time" in line:
+                    arrival[k] = -float(line.split()[0])  # see report_checks
+                elif "slack" in line:
+                    slack[k] = float(line.split()[0])
+
+            if cleanup:
+                os.remove(vfile)
+                os.remove(sdc_file)
+
+            df = pd.DataFrame(constraints, columns=["period", "input_delay", "output_delay"])
+            df.insert(0, "design", name)
+            df["arrival"] = arrival
+            df["slack"] = slack
+            frames.append(df)
+
+        return pd.concat(frames, ignore_index=True)
+
     def elaborate(self, retime=False):
         self.hierarchy("-auto-top")
         if retime:
@@ -0,0 +1,349 @@
+from glob import glob
+from multiprocessing import Pool
+import hashlib
+import os.path
+import random
+import shutil
+import time
+import pandas as pd
+from .splat import Abc_scatter, scripts, util_scripts
+from .utils import update_pareto
+
+# Instead of the fixed point cloud from the shotgun, treat a recipe as a
+# sequence of ABC commands and evolve new ones, starting from the hand
+# written scripts.  A recipe is held as a tuple of "segments". A segment
+# starts with strash or is a whole "&get ... &put" block, so it can be run
+# on whatever network the previous one left behind, and the design can be
+# written to a blif between any two segments and read back later. That
+# lets us memoize the design after every prefix of a recipe: a child that
+# shares its first k segments with anything already evaluated only runs
+# the rest.
+
+
+# Split an ABC script into segments. A new segment starts at every strash
+# or &get, except that commands before the first one (e.g. rec_start3)
+# stay with it.
+def recipe_steps(script):
+    steps = []
+    cur = []
+    in_gia = False
+    started = False
+    for c in filter(None, (s.strip() for s in script.split(";"))):
+        name = c.split()[0]
+        if not in_gia and name in ("strash", "&get") and started:
+            steps.append("; ".join(cur))
+            cur = []
+        if name in ("strash", "&get"):
+            started = True
+        if name == "&get":
+            in_gia = True
+        elif name == "&put":
+            in_gia = False
+        cur.append(c)
+    if cur:
+        steps.append("; ".join(cur))
+    return tuple(steps)
+
+
+def steps_script(steps):
+    return "; ".join(steps)
+
+
+def _prefix_key(steps):
+    return hashlib.sha1("\n".join(steps).encode()).hexdigest()[:20]
+
+
+# The prefix cache for a design lives in its own subdirectory of cache_dir,
+# named from everything the cached blifs depend on besides the recipe: the
+# design itself, the library, the constraints and the initialize script.
+def _context_key(design, libr, constr, initialize):
+    h = hashlib.sha1()
+    with open(design, "rb") as fd:
+        h.update(fd.read())
+    for s in (libr, constr, initialize):
+        h.update(b"\0" + s.encode())
+    return h.hexdigest()[:20]
+
+
+# ABC writes straight to the file name, so write somewhere private and
+# rename, as other workers may be reading the same cache entry
+def _cache_write(cmd, fname):
+    tmp = f"{fname}.{os.getpid()}.tmp"
+    res = cmd(f"write_blif {tmp}")
+    if res[0] == 0:
+        os.replace(tmp, fname)
+    return res
+
+
+# Each worker process has its own ABC, started once
+_wctx = None
+
+def _init_worker(libr, constr, util_scripts):
+    global _wctx
+    _wctx = Abc_scatter(libr=libr, constr=constr, iterations=1,
+                        util_scripts=util_scripts)
+
+
+# Evaluate one recipe on design, starting from the longest prefix already
+# in cache_dir. Returns (steps, result) where result is None on failure.
+def _evaluate(task):
+    design, cache_dir, steps = task
+    cmd = _wctx.cmd
+    start = time.process_time()
+
+    k = len(steps)
+    while k > 0 and not os.path.exists(os.path.join(cache_dir, _prefix_key(steps[:k]) + ".blif")):
+        k -= 1
+    skipped = k
+
+    base = os.path.join(cache_dir, _prefix_key(steps[:k]) + ".blif")
+    if k == 0 and not os.path.exists(base):
+        if cmd(f"read_blif {design}")[0] != 0:
+            return steps, None
+        if _wctx.util_scripts["initialize"] != "":
+            if cmd(_wctx.util_scripts["initialize"])[0] != 0:
+                return steps, None
+        _cache_write(cmd, base)
+    elif cmd(f"read_blif {base}")[0] != 0:
+        return steps, None
+
+    for j in range(k, len(steps)):
+        if cmd(steps[j])[0] != 0:
+            return steps, None
+        _cache_write(cmd, os.path.join(cache_dir, _prefix_key(steps[:j+1]) + ".blif"))
+
+    if _wctx.util_scripts["finalize"] != "":
+        if cmd(_wctx.util_scripts["finalize"])[0] != 0:
+            return steps, None
+    ta = _wctx.parse_timing(cmd("stime -p"))
+    if ta is None:
+        return steps, None
+    gates, area, delay = ta
+    cmd(f"write_blif {os.path.join(cache_dir, _prefix_key(steps) + '_final.blif')}")
+    return steps, {"cpu time": time.process_time() - start,
+                   "gates": gates, "area": area, "delay": delay,
+                   "skipped": skipped}
+
+
+# Evolutionary search over ABC recipes.  Every generation a batch of new
+# (never seen before) recipes is evaluated in parallel and the Pareto
+# archive of (area, delay) is updated.  Children are made by crossover or
+# mutation of parents drawn mostly from the archive.  The search stops
+# after budget distinct recipes have been evaluated.
+class Abc_evolve:
+    def __init__(self,
+                 libr = "/home/macd/libs/sky130_fd_sc_hs__tt_025C_1v80.lib",
+                 constr = "/home/macd/libs/abc.constr",
+                 budget=200,
+                 workers=4,
+                 batch=None,
+                 iterations=5,
+                 max_steps=40,
+                 p_cross=0.4,
+                 p_archive=0.7,
+                 seed=0,
+                 scripts=scripts,
+                 util_scripts=util_scripts
+                 ):
+        self.libr = libr
+        self.constr = constr
+        self.budget = budget
+        self.workers = workers
+        self.batch = batch if batch else 2 * workers
+        self.iterations = iterations
+        self.max_steps = max_steps
+        self.p_cross = p_cross
+        self.p_archive = p_archive
+        self.seed = seed
+        self.scripts = scripts
+        self.util_scripts = util_scripts
+        self.pool = None
+
+        # The gene pool is every distinct segment in the seed scripts
+        self.genes = []
+        for scr in scripts.values():
+            for st in recipe_steps(scr):
+                if st not in self.genes:
+                    self.genes.append(st)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self.pool is None:
+            self.pool = Pool(self.workers, initializer=_init_worker,
+                             initargs=(self.libr, self.constr, self.util_scripts))
+        return self
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    # The seeds are the same points the shotgun would produce, ie each
+    # script run 1 to iterations times
+    def seeds(self):
+        seeds = []
+        for scr in self.scripts.values():
+            st = recipe_steps(scr)
+            for i in range(1, self.iterations+1):
+                if len(st) * i <= self.max_steps:
+                    seeds.append(st * i)
+        return seeds
+
+    def mutate(self, rng, steps):
+        steps = list(steps)
+        op = rng.randrange(5)
+        i = rng.randrange(len(steps))
+        if op == 0:
+            steps.insert(rng.randrange(len(steps)+1), rng.choice(self.genes))
+        elif op == 1 and len(steps) > 1:
+            del steps[i]
+        elif op == 2:
+            steps[i] = rng.choice(self.genes)
+        elif op == 3 and len(steps) > 1:
+            i = rng.randrange(len(steps)-1)
+            steps[i], steps[i+1] = steps[i+1], steps[i]
+        else:
+            j = rng.randrange(i, len(steps)) + 1
+            steps[j:j] = steps[i:j]
+        return tuple(steps)
+
+    def crossover(self, rng, a, b):
+        return a[:rng.randrange(1, len(a)+1)] + b[rng.randrange(len(b)):]
+
+    def children(self, rng, front, evaluated, n):
+        archive = [front[p] for p in front]
+        valid = [s for s, r in evaluated.items() if r is not None]
+        if not valid:
+            return []
+
+        def pick():
+            if archive and rng.random() < self.p_archive:
+                return rng.choice(archive)
+            return rng.choice(valid)
+
+        kids = []
+        tries = 0
+        while len(kids) < n and tries < 100 * n:
+            tries += 1
+            if rng.random() < self.p_cross:
+                kid = self.crossover(rng, pick(), pick())
+            else:
+                kid = self.mutate(rng, pick())
+            if 0 < len(kid) <= self.max_steps and kid not in evaluated and kid not in kids:
+                kids.append(kid)
+        return kids
+
+    # Run the search on one design. Returns a DataFrame with every recipe
+    # evaluated, those on the final Pareto front marked in "Pareto". The
+    # "file" column is relative to cache_dir. If the worker pool is not
+    # already running (see start, or use a with block) it is only kept for
+    # this search.
+    def search(self, design, cache_dir="evolve_cache"):
+        rng = random.Random(self.seed)
+        design = os.path.abspath(design)
+        ctx = _context_key(design, self.libr, self.constr,
+                           self.util_scripts["initialize"])
+        cache_dir = os.path.join(os.path.abspath(cache_dir), ctx)
+        os.makedirs(cache_dir, exist_ok=True)
+        started = self.pool is None
+        self.start()
+        try:
+            return self._search(rng, design, cache_dir, ctx)
+        finally:
+            if started:
+                self.close()
+
+    def _search(self, rng, design, cache_dir, ctx):
+
+        evaluated = {}    # recipe -> result, the memo for whole recipes
+        pareto = set()    # (area, delay) on the front
+        points = {}       # (area, delay) -> first recipe that got there
+        order = []
+        todo = self.seeds()
+        while len(evaluated) < self.budget:
+            todo = [s for s in dict.fromkeys(todo) if s not in evaluated]
+            todo = todo[:self.budget - len(evaluated)]
+            if not todo:
+                front = {p: points[p] for p in pareto}
+                todo = self.children(rng, front, evaluated, self.batch)
+                if not todo:
+                    break
+                continue
+
+            tasks = [(design, cache_dir, st) for st in todo]
+            for steps, res in self.pool.imap(_evaluate, tasks):
+                evaluated[steps] = res
+                order.append(steps)
+                if res is None:
+                    print(f"{design}: recipe failed: {steps_script(steps)}")
+                    continue
+                pt = (res["area"], res["delay"])
+                points.setdefault(pt, steps)
+                pareto = update_pareto(pareto, pt, [0, 1], [])
+
+            front = {p: points[p] for p in pareto}
+            print(f"{design}: {len(evaluated)}/{self.budget} evaluated, "
+                  f"{len(front)} on front")
+            todo = self.children(rng, front, evaluated, self.batch)
+
+        front_recipes = {points[p] for p in pareto}
+        rows = []
+        for n, steps in enumerate(order):
+            res = evaluated[steps]
+            if res is None:
+                continue
+            rows.append([design, os.path.join(ctx, _prefix_key(steps) + "_final.blif"),
+                         f"evo{n}", 1, res["cpu time"], res["gates"], res["area"],
+                         res["delay"], int(steps in front_recipes), len(steps),
+                         res["skipped"], steps_script(steps)])
+        return pd.DataFrame(rows, columns=["design", "file", "script", "iteration",
+                                           "cpu time", "gates", "area", "delay",
+                                           "Pareto", "steps", "skipped", "recipe"])
+
+    # Like Abc_scatter.get_scatter_df, the whole point cloud goes in the csv
+    # (with the front marked in "Pareto"). The blifs are copied out of the
+    # cache so the csv can be used by impl_select.
+    def get_evolve_df(self, fn="input.blif", rn="results.csv",
+                      cache_dir="evolve_cache", cleanup=True):
+        df = self.search(fn, cache_dir)
+        df["design"] = fn
+        for i in df.index:
+            fname = f"{df.at[i, 'script']}.blif"
+            shutil.copy(os.path.join(cache_dir, df.at[i, "file"]), fname)
+            df.at[i, "file"] = fname
+        df.to_csv(rn)
+        if cleanup:
+            shutil.rmtree(cache_dir)
+        return df
+
+
+# Analogous to splat_one, but the points come from the recipe search
+def evolve_one(infile, libr="/home/macd/libs/sky130_fd_sc_hs__tt_025C_1v80.lib",
+               **kwargs):
+    with Abc_evolve(libr=libr, **kwargs) as ectx:
+        return ectx.get_evolve_df(fn=infile)
+
+
+# Analogous to splat, for every module directory in an orlo abc_topdir.  The
+# worker pool is only started once.
+def evolve(abc_topdir=None, **kwargs):
+    mdirs = [os.path.abspath(dr) for dr in glob(f"./{abc_topdir}/*") if os.path.isdir(dr)]
+    olddir = os.getcwd()
+
+    with Abc_evolve(**kwargs) as ectx:
+        for dr in mdirs:
+            # no output.blif means input.blif was empty, see splat
+            if not os.path.exists(dr + "/output.blif"):
+                shutil.rmtree(dr)
+            else:
+                os.chdir(dr)
+                ectx.get_evolve_df()
+
+    os.chdir(olddir)
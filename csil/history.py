@@ -0,0 +1,196 @@
+from glob import glob
+import os.path
+import numpy as np
+import pandas as pd
+from .utils import ImplMode
+
+# The archived results.csv files of many runs and modules get too big to
+# read in one go, so they are read here in chunks with compact dtypes and
+# reduced as they go by.  Only the running Pareto fronts, best picks and
+# per design sums are kept, so memory does not grow with the history.
+
+# results.csv columns we use and the dtypes they are read with. The
+# unnamed index column and "Pareto" are not read at all.
+HISTORY_DTYPES = {
+    "design"    : "category",
+    "file"      : "category",
+    "script"    : "category",
+    "iteration" : "int32",
+    "cpu time"  : "float32",
+    "gates"     : "int32",
+    "area"      : "float32",
+    "delay"     : "float32",
+}
+
+# Columns of the rows kept for the fronts and picks. "source" is the
+# directory the results.csv was in, so source/file is the blif.
+_KEEP = ["design", "source", "file", "script", "iteration", "gates", "area", "delay"]
+
+
+# Expand the globs in paths (a name or a list) and read them in chunks of at
+# most chunksize rows.  splat calls every design "input.blif", so by default
+# (key="auto") those rows get the name of the directory the csv is in (ie
+# the orlo module directory) as their design instead. With key="dir" every
+# row does, and with key="design" the design column is used as it is.
+def read_history(paths, chunksize=1000000, key="auto"):
+    if isinstance(paths, str):
+        paths = [paths]
+    for pat in paths:
+        # A pattern that matches nothing is just no history, but a plain
+        # name that does not exist is still an error
+        fns = sorted(glob(pat))
+        if not fns and not any(c in pat for c in "*?["):
+            fns = [pat]
+        for fn in fns:
+            source = os.path.dirname(os.path.abspath(fn))
+            for chunk in pd.read_csv(fn, usecols=lambda c: c in HISTORY_DTYPES,
+                                     dtype=HISTORY_DTYPES, chunksize=chunksize):
+                chunk["source"] = pd.Categorical([source] * len(chunk.index))
+                name = os.path.basename(source)
+                if key == "dir":
+                    chunk["design"] = pd.Categorical([name] * len(chunk.index))
+                elif key == "auto" and "input.blif" in chunk["design"].cat.categories:
+                    chunk["design"] = chunk["design"].astype(str).replace(
+                        "input.blif", name).astype("category")
+                yield chunk
+
+
+# The rows of df on the (min area, min delay) Pareto front of their design,
+# with the same rule as update_pareto: a point is dropped if another is no
+# worse in both and better in one, and only one of equal points is kept.
+def pareto_rows(df):
+    df = df.sort_values(["design", "area", "delay"], kind="stable")
+    cmin = df.groupby("design", observed=True, sort=False)["delay"].cummin()
+    prev = cmin.groupby(df["design"], observed=True, sort=False).shift(1)
+    return df.loc[df["delay"] < prev.fillna(np.inf)]
+
+
+# The first row of each design with the minimum of col
+def _min_rows(df, col):
+    idx = df.groupby("design", observed=True, sort=False)[col].idxmin()
+    return df.loc[idx.to_numpy()]
+
+
+# Categoricals from different chunks don't concatenate to categoricals, and
+# the kept frames are small, so they are held as plain strings
+def _plain(df):
+    df = df[_KEEP].reset_index(drop=True)
+    for c in ("design", "source", "file", "script"):
+        df[c] = df[c].astype(str)
+    return df
+
+
+_SUMS = ["count", "area_sum", "area_min", "area_max", "delay_sum",
+         "delay_min", "delay_max", "cpu_sum"]
+
+
+# Until some rows have been read, everything is an empty frame with the
+# right columns
+class History:
+    def __init__(self):
+        self.front = pd.DataFrame(columns=_KEEP)
+        self.fastest = pd.DataFrame(columns=_KEEP)
+        self.smallest = pd.DataFrame(columns=_KEEP)
+        self.stats = pd.DataFrame(columns=_SUMS, index=pd.Index([], name="design"))
+        self.script_stats = pd.DataFrame(columns=_SUMS, index=pd.MultiIndex.from_tuples(
+            [], names=["design", "script"]))
+        self.rows = 0
+
+    # Sums are done in float64, over many chunks float32 would drift
+    def _sums(self, chunk, by):
+        vals = chunk[["area", "delay", "cpu time"]].astype(np.float64)
+        g = vals.groupby([chunk[c] for c in by], observed=True, sort=False)
+        agg = g.agg(count=("area", "size"),
+                    area_sum=("area", "sum"), area_min=("area", "min"),
+                    area_max=("area", "max"), delay_sum=("delay", "sum"),
+                    delay_min=("delay", "min"), delay_max=("delay", "max"),
+                    cpu_sum=("cpu time", "sum"))
+        if len(by) == 1:
+            agg.index = pd.Index(agg.index.astype(str), name=by[0])
+        else:
+            agg.index = pd.MultiIndex.from_tuples([tuple(map(str, k)) for k in agg.index],
+                                                  names=by)
+        return agg
+
+    @staticmethod
+    def _merge_sums(old, new):
+        if old.empty:
+            return new
+        both = pd.concat([old, new])
+        how = {c: ("min" if c.endswith("_min") else "max" if c.endswith("_max") else "sum")
+               for c in both.columns}
+        return both.groupby(level=list(both.index.names)).agg(how)
+
+    # Fold one chunk (as from read_history) into the running results
+    def update(self, chunk):
+        if chunk.empty:
+            return self
+        front = _plain(pareto_rows(chunk))
+        fast = _plain(_min_rows(chunk, "delay"))
+        small = _plain(_min_rows(chunk, "area"))
+        if self.rows > 0:
+            front = pareto_rows(pd.concat([self.front, front], ignore_index=True))
+            fast = _min_rows(pd.concat([self.fastest, fast], ignore_index=True), "delay")
+            small = _min_rows(pd.concat([self.smallest, small], ignore_index=True), "area")
+        self.front = front.reset_index(drop=True)
+        self.fastest = fast.reset_index(drop=True)
+        self.smallest = small.reset_index(drop=True)
+        self.stats = self._merge_sums(self.stats, self._sums(chunk, ["design"]))
+        self.script_stats = self._merge_sums(self.script_stats,
+                                             self._sums(chunk, ["design", "script"]))
+        self.rows += len(chunk.index)
+        return self
+
+    def feed(self, paths, chunksize=1000000, key="auto"):
+        for chunk in read_history(paths, chunksize, key):
+            self.update(chunk)
+        return self
+
+    # The Pareto front of every design, or just of design
+    def pareto(self, design=None):
+        if design is None:
+            return self.front
+        return self.front.loc[self.front["design"] == design].reset_index(drop=True)
+
+    # One row per design, picked like choose_impl does. The OPTIMAL point (see
+    # get_best) is always on the front, so only the front is searched, but
+    # scaled by the ranges over the whole history. A design whose area or
+    # delay never varies is scaled by 1 in that direction instead.
+    def best(self, mode=ImplMode.OPTIMAL):
+        if mode == ImplMode.FASTEST:
+            return self.fastest
+        if mode == ImplMode.SMALLEST:
+            return self.smallest
+        if self.rows == 0:
+            return pd.DataFrame(columns=_KEEP)
+
+        f = self.front.join(self.stats[["area_min", "area_max", "delay_min", "delay_max"]],
+                            on="design")
+        s_area = ((f["area_max"].astype(np.float64) - f["area_min"])**2).replace(0.0, 1.0)
+        s_delay = ((f["delay_max"].astype(np.float64) - f["delay_min"])**2).replace(0.0, 1.0)
+        f["dist"] = ((f["area_min"] - f["area"])**2 / s_area +
+                     (f["delay_min"] - f["delay"])**2 / s_delay)
+        return _min_rows(f, "dist")[_KEEP].reset_index(drop=True)
+
+    def _summary(self, st):
+        out = st[["count"]].copy()
+        for c in ("area", "delay"):
+            out[f"{c} mean"] = st[f"{c}_sum"] / st["count"]
+            out[f"{c} min"] = st[f"{c}_min"]
+            out[f"{c} max"] = st[f"{c}_max"]
+        out["cpu time"] = st["cpu_sum"]
+        return out
+
+    # Per design count, mean/min/max of area and delay and total cpu time
+    def summary(self):
+        return self._summary(self.stats)
+
+    # As summary, but per design and script
+    def script_summary(self):
+        return self._summary(self.script_stats)
+
+
+# Scan a whole exploration history (globs of results.csv files) in bounded
+# memory. See History for what is available afterwards.
+def scan_history(paths, chunksize=1000000, key="auto"):
+    return History().feed(paths, chunksize, key)
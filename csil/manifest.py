@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import pandas as pd
+
+# Every run of CDesign.setup (ie the orlo command) makes a new randomly named
+# abc_topdir, so the results of the previous exploration are not found by
+# name. The manifest remembers, for each module directory ("<module>_<n>",
+# n being the clock domain), a hash of its input.blif, the directory it was
+# explored in and the implementation chosen for it. A module whose logic has
+# not changed can then just take over its old results instead of being
+# explored again.
+
+
+# Yosys names internal nets with a global counter, so an edit to one module
+# can rename the nets in all of them.  Hash the blif with the internal names
+# replaced by their order of appearance. Port names are kept as they are,
+# since the old output.blif has to match them when it is reintegrated.
+def blif_hash(fn):
+    with open(fn) as fd:
+        text = fd.read().replace("\\\n", " ")
+
+    lines = []
+    for line in text.splitlines():
+        line = line.split("#")[0].strip()
+        if line:
+            lines.append(line.split())
+
+    ports = set()
+    for toks in lines:
+        if toks[0] in (".inputs", ".outputs", ".clock"):
+            ports.update(toks[1:])
+
+    names = {}
+    def canon(tok):
+        if tok in ports:
+            return tok
+        if tok not in names:
+            names[tok] = f"n{len(names)}"
+        return names[tok]
+
+    h = hashlib.sha256()
+    for toks in lines:
+        if toks[0] == ".names":
+            toks = [toks[0]] + [canon(t) for t in toks[1:]]
+        elif toks[0] == ".latch":
+            toks = [toks[0], canon(toks[1]), canon(toks[2])] + toks[3:]
+        elif toks[0] in (".gate", ".subckt"):
+            toks = toks[:2] + [f"{t.split('=')[0]}={canon(t.split('=', 1)[1])}"
+                               if "=" in t else t for t in toks[2:]]
+        h.update(" ".join(toks).encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, fn="csil_manifest.json"):
+        self.fn = os.path.abspath(fn)
+        self.entries = {}
+        if os.path.exists(self.fn):
+            with open(self.fn) as fd:
+                self.entries = json.load(fd)
+
+    def save(self):
+        tmp = self.fn + ".tmp"
+        with open(tmp, "w") as fd:
+            json.dump(self.entries, fd, indent=1, sort_keys=True)
+        os.replace(tmp, self.fn)
+
+    # The directory name, which orlo makes from the module name and clock domain
+    def key(self, mdir):
+        return os.path.basename(os.path.abspath(mdir))
+
+    # The previous entry for mdir if its logic and the exploration settings
+    # (config, see splat.scatter_config) are unchanged and the results of that
+    # run are still around, else None
+    def lookup(self, mdir, digest, config=None):
+        ent = self.entries.get(self.key(mdir))
+        if ent is None or ent.get("hash") != digest or ent.get("config") != config:
+            return None
+        for fn in ("results.csv", "output.blif"):
+            if not os.path.exists(os.path.join(ent["dir"], fn)):
+                return None
+        return ent
+
+    # Copy the results, the blifs they refer to and the chosen output.blif of
+    # a previous run into mdir. They are copied, not linked, because ABC
+    # writes blifs in place if mdir is explored again later.
+    def carry_over(self, mdir, ent):
+        mdir = os.path.abspath(mdir)
+        if os.path.samefile(mdir, ent["dir"]):
+            return
+        sc_df = pd.read_csv(os.path.join(ent["dir"], "results.csv"))
+        for fn in set(sc_df["file"]) | {"results.csv", "output.blif"}:
+            src = os.path.join(ent["dir"], fn)
+            if os.path.exists(src):
+                shutil.copy(src, os.path.join(mdir, fn))
+
+    # Only entries that carry a hash can be matched by lookup, so anything
+    # else (eg impl_select) should only update entries that already exist
+    def has(self, mdir):
+        return self.key(mdir) in self.entries
+
+    # Update the entry for mdir, or with new=True start it afresh
+    def record(self, mdir, new=False, **kwargs):
+        key = self.key(mdir)
+        if new:
+            self.entries[key] = {}
+        ent = self.entries.setdefault(key, {})
+        module, _, domain = key.rpartition("_")
+        ent.update(module=module, domain=domain, dir=os.path.abspath(mdir))
+        ent.update(kwargs)
+        return ent
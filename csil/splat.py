@@ -6,6 +6,10 @@ import numpy as np
 import re
 import shutil
 import time
+import hashlib
+import inspect
+import json
+from .manifest import Manifest, blif_hash
 
 # These assumes we live in the old ABC space so we explicitly
 # move into ABC9 at the start and back to old ABC at the end of
@@ -147,7 +151,7 @@ class Abc_scatter:
                                            "delay", "Pareto"])
 
         df = self.shotgun(fn)
-        results_df = results_df.append(df)
+        results_df = pd.concat([results_df, df])
         results_df.to_csv(rn)
         return results_df
 
@@ -159,6 +163,15 @@ def splat_one(infile, libr="/home/macd/libs/sky130_fd_sc_hs__tt_025C_1v80.lib"):
     sc_df = sctx.get_scatter_df(fn=infile)
 
 
+# A digest of the Abc_scatter settings (library, constraints, scripts and
+# iterations) the keyword arguments give, with the defaults filled in
+def scatter_config(**kwargs):
+    args = inspect.signature(Abc_scatter).bind(**kwargs)
+    args.apply_defaults()
+    text = json.dumps(args.arguments, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
 # Given a abc_topdir, run all the scripts for a set number of iterations on
 # each "input.blif" file in each subdirectory in abc_topdir.  The leaves all
 # the produced blif's (# of scripts) * (# of iterations) in the directories
@@ -166,21 +179,54 @@ def splat_one(infile, libr="/home/macd/libs/sky130_fd_sc_hs__tt_025C_1v80.lib"):
 # results (area, delay) for each blif.  This is designed to be used with the
 # Yosys plugin "orlo" that creates more durable sub directories for the
 # intermediate designs.
-def splat(abc_topdir=None):
+# If manifest (a file name or a Manifest) is given, a module whose input.blif
+# is the same as in the previous run recorded there, and explored with the
+# same Abc_scatter settings, is not explored again. Its results and
+# output.blif are carried over from that run instead. Any other keyword
+# arguments are passed on to Abc_scatter.
+def splat(abc_topdir=None, manifest=None, **kwargs):
     mdirs = [os.path.abspath(dr) if os.path.isdir(dr) else None for dr in glob(f"./{abc_topdir}/*")]
     olddir = os.getcwd()
+    if isinstance(manifest, str):
+        manifest = Manifest(manifest)
+
+    if manifest is not None:
+        config = scatter_config(**kwargs)
 
-    sctx = Abc_scatter() # only start ABC once
+    sctx = None
     for dr in mdirs:
         # no output.blif means input.blif was empty. Delete it here so
         # we don't mess with it later
         if not os.path.exists(dr + "/output.blif"):
             shutil.rmtree(dr)
-        else:        
-            os.chdir(dr)
-            sc_df = sctx.get_scatter_df()
+            continue
+
+        if manifest is not None:
+            digest = blif_hash(dr + "/input.blif")
+            prev = manifest.lookup(dr, digest, config)
+            if prev is not None:
+                print(f"{os.path.basename(dr)} unchanged, using results from {prev['dir']}")
+                manifest.carry_over(dr, prev)
+                manifest.record(dr)
+                continue
+            manifest.record(dr, new=True, hash=digest, config=config, impl=None)
+
+        # Remove the blifs of an earlier exploration here (or carried over
+        # into here) first, so none are left that the new results.csv does
+        # not list, and so ABC never writes through a file another run shares
+        if os.path.exists(dr + "/results.csv"):
+            for fn in set(pd.read_csv(dr + "/results.csv")["file"]) - {"input.blif", "output.blif"}:
+                if os.path.exists(os.path.join(dr, fn)):
+                    os.remove(os.path.join(dr, fn))
+
+        if sctx is None:
+            sctx = Abc_scatter(**kwargs) # only start ABC once
+        os.chdir(dr)
+        sc_df = sctx.get_scatter_df()
 
     os.chdir(olddir)    
+    if manifest is not None:
+        manifest.save()
 
 
 def dump_script(script, iters):
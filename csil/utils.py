@@ -1,46 +1,65 @@
 import time
+import io
 import os.path
 import re
 import sys
+import html
 import numpy as np
 import pandas as pd
-import matplotlib.pylab as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from multiprocessing import Pool
 from glob import glob
 import shutil
 from enum import Enum
+from .manifest import Manifest
 
-def plot_pareto(d, df):
-    fig, ax1 = plt.subplots(1, 1)
-    fig.set_figheight(7)
-    fig.set_figwidth(9)
+# The plots are made on bare Agg figures rather than through pyplot, so
+# there is no global state and no display is needed.  That also makes them
+# safe to render in worker processes (see plt_csv).
+def _new_fig():
+    fig = Figure(figsize=(9, 7))
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot(1, 1, 1)
+
+
+def _save_fig(fig, nm, svg):
+    fig.savefig(nm)
+    if not svg:
+        return None
+    buf = io.StringIO()
+    fig.savefig(buf, format="svg")
+    return buf.getvalue()
+
+
+# p is the Pareto front of df, if it has already been computed
+def plot_pareto(d, df, p=None, svg=False):
+    fig, ax1 = _new_fig()
 
     # Mark the Pareto optimal points for the area vs delay plot
-    p = get_pareto(df[["area", "delay"]].to_numpy(), [0, 1], [])
-    plt.plot(p[:, 0], p[:, 1], ".")
+    if p is None:
+        p = get_pareto(df[["area", "delay"]].to_numpy(), [0, 1], [])
+    ax1.plot(p[:, 0], p[:, 1], ".", label="Pareto front")
         
     ax1.set_xlabel("area")
     ax1.set_ylabel("delay")
     ax1.legend()
     ax1.set_title(f"Pareto area vs delay for {d}")
     nm = os.path.splitext(os.path.basename(d))[0] + "_pareto.png"
-    fig.savefig(nm)
-    plt.close(fig)
+    return _save_fig(fig, nm, svg)
 
 
-def plot_it(d, df, x, y):
-    fig, ax1 = plt.subplots(1, 1)
-    fig.set_figheight(7)
-    fig.set_figwidth(9)
+def plot_it(d, df, x, y, p=None, svg=False):
+    fig, ax1 = _new_fig()
 
-    for sc in set(df['script']):
-        rows = df.loc[df['script'] == sc]
-        print(rows)
-        plt.plot(rows[x], rows[y], ".-", label=sc)
+    for sc, rows in df.groupby("script", sort=False):
+        ax1.plot(rows[x], rows[y], ".-", label=sc)
 
     # Mark the Pareto optimal points for the area vs delay plot
     if x == "area":
-        p = get_pareto(df[["area", "delay"]].to_numpy(), [0, 1], [])
-        plt.scatter(p[:, 0], p[:, 1], s=80, facecolors="none", edgecolors="r")
+        if p is None:
+            p = get_pareto(df[["area", "delay"]].to_numpy(), [0, 1], [])
+        ax1.scatter(p[:, 0], p[:, 1], s=80, facecolors="none", edgecolors="r")
         
     ax1.set_xlabel(x)
     ax1.set_ylabel(y)
@@ -48,8 +67,7 @@ def plot_it(d, df, x, y):
     ax1.set_title(f"{x} vs {y} for {d}")
     #nm = "all_scatter_plots/" + os.path.splitext(os.path.basename(d))[0] + f"_{x}_vs_{y}" + ".png"
     nm = os.path.splitext(os.path.basename(d))[0] + f"_{x}_vs_{y}" + ".png"
-    fig.savefig(nm)
-    plt.close(fig)
+    return _save_fig(fig, nm, svg)
 
 
 # We have two n-vectors x and y.  min_idxs is a vector of indices at which
@@ -108,16 +126,51 @@ def get_pareto(V, min_idxs, max_idxs):
     return np.concatenate([np.array(o, ndmin=2) for o in pareto])
 
 
+# All the plots for one design, with the front computed only once. Run in
+# a worker by plt_csv, so it only takes and returns picklable things.
+def _plot_design(job):
+    d, drows, do_cpu, svg = job
+    p = get_pareto(drows[["area", "delay"]].to_numpy(), [0, 1], [])
+    svgs = [plot_it(d, drows, "area", "delay", p, svg),
+            plot_pareto(d, drows, p, svg)]
+    if do_cpu:
+        svgs.append(plot_it(d, drows, "iteration", "cpu time", svg=svg))
+    return d, p, svgs
+
+
+# One page with every design's plots inline, and its Pareto points
+def write_summary(fn, results):
+    with open(fn, "w") as fd:
+        fd.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+                 "<title>csil results</title></head><body>\n")
+        for d, p, svgs in results:
+            fd.write(f"<h2>{html.escape(str(d))}</h2>\n")
+            for s in svgs:
+                fd.write(s[s.index("<svg"):] + "\n")
+            fd.write("<table><tr><th>area</th><th>delay</th></tr>\n")
+            for a, dl in sorted(map(tuple, p)):
+                fd.write(f"<tr><td>{a}</td><td>{dl}</td></tr>\n")
+            fd.write("</table>\n")
+        fd.write("</body></html>\n")
+
+
 # Plot the results contained in the CSV file "fn".  Circle the design points
-# that are on the Pareto Front.
-def plt_csv(fn, do_cpu=False):
+# that are on the Pareto Front.  The designs are rendered in parallel by
+# a pool of worker processes (one per cpu by default, workers=1 to stay in
+# this process).  If summary is a file name, a single HTML page with all the
+# plots (as SVG) is also written there.
+def plt_csv(fn, do_cpu=False, workers=None, summary=None):
     sc_df = pd.read_csv(fn)
-    for d in set(sc_df['design']):
-        drows = sc_df.loc[sc_df['design'] == d]
-        plot_it(d, drows, "area", "delay")
-        plot_pareto(d, drows)
-        if do_cpu:
-            plot_it(d, drows, "iteration", "cpu time")
+    jobs = [(d, drows, do_cpu, summary is not None)
+            for d, drows in sc_df.groupby("design", sort=False)]
+    if workers == 1 or len(jobs) < 2:
+        results = list(map(_plot_design, jobs))
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(_plot_design, jobs)
+
+    if summary is not None:
+        write_summary(summary, results)
 
 
 # Just a quick and dirty hack to see if we get useful results, _but_ it is 
@@ -161,7 +214,7 @@ class ImplMode(Enum):
     OPTIMAL  = 3
 
 # by copying the best implementation to output.blif, it will be used by
-# reintegrate
+# reintegrate. Returns the name of the file chosen.
 def choose_impl(fn, mode):
     sc_df = pd.read_csv(fn)
     if mode == ImplMode.FASTEST:
@@ -174,13 +227,22 @@ def choose_impl(fn, mode):
     #print("idx: ", idx, "row: ", sc_df.loc[[idx]])
     print("Choosing impl: ", sc_df["file"][idx])
     shutil.copy(sc_df["file"][idx], "output.blif")
+    return sc_df["file"][idx]
         
 
-def impl_select(abc_dir=None, mode=ImplMode.FASTEST):
+# If manifest (a file name or a Manifest, see splat) is given, the choice for
+# each module splat recorded there is added to it.
+def impl_select(abc_dir=None, mode=ImplMode.FASTEST, manifest=None):
     mdirs = [os.path.abspath(dr) if os.path.isdir(dr) else None for dr in glob(f"./{abc_dir}/*")]
     olddir = os.getcwd()
+    if isinstance(manifest, str):
+        manifest = Manifest(manifest)
     for dr in mdirs:
         os.chdir(dr)
-        choose_impl("results.csv", mode)
+        impl = choose_impl("results.csv", mode)
+        if manifest is not None and manifest.has(dr):
+            manifest.record(dr, impl=impl, mode=mode.name)
 
     os.chdir(olddir)
+    if manifest is not None:
+        manifest.save()